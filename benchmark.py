@@ -0,0 +1,446 @@
+"""
+Plot-free, timed versions of the reductions behind the paper figures.
+
+The real workloads use the bundled SPRAT and FLOYDS frames with the same
+parameters as fig_01 to fig_07. The synthetic workloads scale the frame
+size and the number of traces. Every workload reports its wall time, CPU
+time, peak memory and throughput, and can be compared against a saved
+baseline.
+
+    python benchmark.py --save-baseline benchmark_baseline.json
+    python benchmark.py --baseline benchmark_baseline.json --threshold 0.2
+"""
+import argparse
+import json
+import sys
+
+from aspired import spectral_reduction
+from astropy.io import fits
+from scipy.ndimage import rotate
+import numpy as np
+
+from figure_helpers import mask_slices
+from profiling import StageProfiler
+
+SPRAT_STANDARD = 'v_s_20180810_27_1_0_2.fits.gz'
+SPRAT_SCIENCE = 'v_e_20180810_12_1_0_2.fits.gz'
+SPRAT_ARC = 'v_a_20180810_28_1_0_1.fits.gz'
+FLOYDS = 'ogg2m001-en06-20160111-0005-e00.fits.fz'
+
+atlas = [
+    4193.5, 4385.77, 4500.98, 4524.68, 4582.75, 4624.28, 4671.23, 4697.02,
+    4734.15, 4807.02, 4921.48, 5028.28, 5618.88, 5823.89, 5893.29, 5934.17,
+    6182.42, 6318.06, 6472.841, 6595.56, 6668.92, 6728.01, 6827.32, 6976.18,
+    7119.60, 7257.9, 7393.8, 7584.68, 7642.02, 7740.31, 7802.65, 7887.40,
+    7967.34, 8057.258
+]
+element = ['Xe'] * len(atlas)
+
+
+def sprat_twodspec(fits_file):
+    twodspec = spectral_reduction.TwoDSpec(fits_file.data,
+                                           fits_file.header,
+                                           cosmicray=True,
+                                           log_level='CRITICAL',
+                                           log_file_name=None)
+    return twodspec
+
+
+def floyds_twodspec():
+    '''
+    The fig_02 frame, masked but not rotated.
+
+    '''
+    fits_file = fits.open(FLOYDS)[1]
+    twodspec = spectral_reduction.TwoDSpec(fits_file.data,
+                                           header=fits_file.header,
+                                           spatial_mask=np.arange(0, 330),
+                                           spec_mask=np.arange(0, 1500),
+                                           cosmicray=True,
+                                           sigclip=3.,
+                                           readnoise=3.5,
+                                           gain=2.3,
+                                           log_level='CRITICAL',
+                                           log_file_name=None)
+    return twodspec
+
+
+def floyds_rotated_twodspec():
+    '''
+    The fig_03 frame: rotated by 6 degrees and cropped to the masked region
+    plus the cosmic ray border.
+
+    '''
+    fits_file = fits.open(FLOYDS)[1]
+    data = rotate(fits_file.data, 6)
+    spatial_mask = np.arange(180, 420)
+    spec_mask = np.arange(15, 1500)
+    spatial_slice, spec_slice = mask_slices(spatial_mask, spec_mask)
+    twodspec = spectral_reduction.TwoDSpec(
+        data[spatial_slice, spec_slice],
+        header=fits_file.header,
+        spatial_mask=spatial_mask - spatial_slice.start,
+        spec_mask=spec_mask - spec_slice.start,
+        cosmicray=True,
+        sigclip=3.,
+        readnoise=3.5,
+        gain=2.3,
+        log_level='CRITICAL',
+        log_file_name=None)
+    return twodspec
+
+
+def synthetic_frame(nspatial, nspec, ntrace=1, seed=0):
+    '''
+    Poisson noise realisation of a flat sky with ntrace gently curved
+    Gaussian traces spread evenly along the spatial direction.
+
+    '''
+    rng = np.random.default_rng(seed)
+    y = np.arange(nspatial)[:, None]
+    x = np.arange(nspec)[None, :]
+    frame = np.full((nspatial, nspec), 100.)
+    for i in range(ntrace):
+        centre = nspatial * (i + 1) / (ntrace + 1) + 5. * np.sin(
+            np.pi * x / nspec)
+        frame += 1000. * np.exp(-0.5 * ((y - centre) / 3.)**2.)
+    return rng.poisson(frame).astype(float)
+
+
+def bench_trace_sprat(profiler):
+    twodspec = sprat_twodspec(fits.open(SPRAT_STANDARD)[0])
+    with profiler.stage('trace_sprat',
+                        pixels=twodspec.img.size,
+                        nwindow=10):
+        twodspec.ap_trace(nspec=1, nwindow=10, display=False)
+
+
+def bench_trace_floyds(profiler):
+    twodspec = floyds_rotated_twodspec()
+    with profiler.stage('trace_floyds',
+                        pixels=twodspec.img.size,
+                        nwindow=50):
+        twodspec.ap_trace(nspec=1,
+                          nwindow=50,
+                          ap_faint=10,
+                          trace_width=20,
+                          resample_factor=5,
+                          shift_tol=120,
+                          fit_deg=7,
+                          display=False)
+
+
+def make_bench_rectify(upsample_factor):
+
+    def bench_rectify(profiler):
+        twodspec = floyds_twodspec()
+        twodspec.ap_trace(nspec=1,
+                          ap_faint=10,
+                          trace_width=25,
+                          shift_tol=50,
+                          fit_deg=7,
+                          display=False)
+        with profiler.stage('rectify_x{}'.format(upsample_factor),
+                            pixels=twodspec.img.size,
+                            upsample_factor=upsample_factor):
+            twodspec.get_rectification(upsample_factor=upsample_factor)
+
+    return bench_rectify
+
+
+def make_bench_extract(algorithm):
+
+    def bench_extract(profiler):
+        twodspec = sprat_twodspec(fits.open(SPRAT_SCIENCE)[0])
+        twodspec.ap_trace(nspec=1, nwindow=10, display=False)
+        if algorithm == 'tophat':
+            kwargs = {'optimal': False}
+        elif algorithm == 'marsh89':
+            kwargs = {
+                'optimal': True,
+                'algorithm': 'marsh89',
+                'pord': 4,
+                'nreject': 0,
+                'qmode': 'fast-linear'
+            }
+        else:
+            kwargs = {'optimal': True, 'algorithm': algorithm}
+        with profiler.stage('extract_{}'.format(algorithm),
+                            pixels=twodspec.img.size):
+            twodspec.ap_extract(apwidth=10,
+                                skywidth=5,
+                                skysep=0,
+                                skydeg=1,
+                                **kwargs)
+
+    return bench_extract
+
+
+def bench_wavecal(profiler):
+    fits_file = fits.open(SPRAT_STANDARD)[0]
+    twodspec = sprat_twodspec(fits_file)
+    twodspec.ap_trace(nspec=1, nwindow=10, display=False)
+    twodspec.add_arc(fits.open(SPRAT_ARC)[0])
+    twodspec.extract_arc_spec()
+
+    onedspec = spectral_reduction.OneDSpec()
+    onedspec.from_twodspec(twodspec, stype='science')
+
+    with profiler.stage('wavecal', pixels=twodspec.spec_size,
+                        max_tries=2000):
+        onedspec.find_arc_lines(prominence=2,
+                                distance=5,
+                                refine_window_width=3,
+                                display=False,
+                                stype='science')
+        onedspec.initialise_calibrator(stype='science')
+        onedspec.set_hough_properties(range_tolerance=500.,
+                                      xbins=100,
+                                      ybins=100,
+                                      min_wavelength=3800.,
+                                      max_wavelength=8200.,
+                                      stype='science')
+        onedspec.set_ransac_properties(sample_size=10,
+                                       top_n_candidate=10,
+                                       filter_close=True,
+                                       ransac_tolerance=10.,
+                                       stype='science')
+        onedspec.add_user_atlas(
+            elements=element,
+            wavelengths=atlas,
+            pressure=fits_file.header['REFPRES'] * 100.,
+            temperature=fits_file.header['REFTEMP'],
+            relative_humidity=fits_file.header['REFHUMID'],
+            constrain_poly=True,
+            stype='science')
+        onedspec.do_hough_transform(stype='science')
+        onedspec.fit(fit_deg=5, max_tries=2000, stype='science')
+
+
+def bench_fluxcal(profiler):
+    arc = fits.open(SPRAT_ARC)[0]
+    twodspecs = []
+    for filename in [SPRAT_SCIENCE, SPRAT_STANDARD]:
+        twodspec = sprat_twodspec(fits.open(filename)[0])
+        twodspec.ap_trace(nspec=1, nwindow=10, display=False)
+        twodspec.add_arc(arc)
+        twodspec.extract_arc_spec()
+        twodspec.ap_extract(apwidth=10,
+                            skywidth=5,
+                            skysep=0,
+                            skydeg=1,
+                            optimal=True,
+                            algorithm='horne86')
+        twodspecs.append(twodspec)
+
+    onedspec = spectral_reduction.OneDSpec()
+    onedspec.from_twodspec(twodspecs[0], stype='science')
+    onedspec.from_twodspec(twodspecs[1], stype='standard')
+    onedspec.find_arc_lines(prominence=2, distance=5, refine_window_width=3)
+    onedspec.initialise_calibrator()
+    onedspec.set_hough_properties(range_tolerance=500.,
+                                  xbins=100,
+                                  ybins=100,
+                                  min_wavelength=3800.,
+                                  max_wavelength=8200.)
+    onedspec.set_ransac_properties(sample_size=10,
+                                   top_n_candidate=10,
+                                   filter_close=True,
+                                   ransac_tolerance=10.)
+    onedspec.add_user_atlas(elements=element,
+                            wavelengths=atlas,
+                            constrain_poly=True)
+    onedspec.do_hough_transform()
+    onedspec.fit(max_tries=2000)
+    onedspec.apply_wavelength_calibration()
+
+    with profiler.stage('fluxcal', pixels=twodspecs[1].spec_size):
+        onedspec.load_standard('hilt102')
+        onedspec.get_sensitivity()
+        onedspec.apply_flux_calibration()
+
+
+def bench_extinction(profiler):
+    wave = np.arange(3000, 10000)
+    onedspec = spectral_reduction.OneDSpec(logger_name=None)
+    with profiler.stage('extinction', pixels=4 * len(wave)):
+        for site in ['orm', 'mk', 'cp', 'ls']:
+            onedspec.set_atmospheric_extinction(site)
+            onedspec.extinction_func(wave)
+
+
+def make_bench_synthetic(name, nspatial, nspec, ntrace):
+
+    def bench_synthetic(profiler):
+        frame = synthetic_frame(nspatial, nspec, ntrace)
+        with profiler.stage(name, pixels=frame.size, ntrace=ntrace):
+            twodspec = spectral_reduction.TwoDSpec(frame,
+                                                   cosmicray=False,
+                                                   readnoise=5.7,
+                                                   gain=2.6,
+                                                   log_level='CRITICAL',
+                                                   log_file_name=None)
+            twodspec.ap_trace(nspec=ntrace, nwindow=25, display=False)
+            twodspec.ap_extract(apwidth=10,
+                                skywidth=5,
+                                skysep=3,
+                                skydeg=1,
+                                optimal=False)
+
+    return bench_synthetic
+
+
+WORKLOADS = {
+    'trace_sprat': bench_trace_sprat,
+    'trace_floyds': bench_trace_floyds,
+    'rectify_x1': make_bench_rectify(1),
+    'rectify_x5': make_bench_rectify(5),
+    'rectify_x10': make_bench_rectify(10),
+    'extract_tophat': make_bench_extract('tophat'),
+    'extract_horne86': make_bench_extract('horne86'),
+    'extract_marsh89': make_bench_extract('marsh89'),
+    'wavecal': bench_wavecal,
+    'fluxcal': bench_fluxcal,
+    'extinction': bench_extinction,
+    'synthetic_2k': make_bench_synthetic('synthetic_2k', 2048, 2048, 1),
+    'synthetic_4k': make_bench_synthetic('synthetic_4k', 4096, 4096, 1),
+    'synthetic_multi': make_bench_synthetic('synthetic_multi', 1024, 2048,
+                                            5),
+}
+
+
+def run(workloads, repeat=3, trace_memory=True):
+    '''
+    Run each workload repeat times with tracemalloc off and keep the
+    fastest run. The peak memory is measured in one more run with
+    tracemalloc on, so that its overhead does not inflate the timings. It
+    is recorded as 0 if trace_memory is False. A workload that raises is
+    recorded as {'failed': error} and the others still run.
+
+    '''
+    results = {}
+    for name in workloads:
+        try:
+            results[name] = _run_workload(name, repeat, trace_memory)
+        except Exception as e:
+            results[name] = {'failed': '{}: {}'.format(type(e).__name__, e)}
+
+    return results
+
+
+def _run_workload(name, repeat, trace_memory):
+    profiler = StageProfiler(trace_memory=False)
+    for _ in range(repeat):
+        WORKLOADS[name](profiler)
+
+    records = [r for r in profiler.records if r.stage == name]
+    best = min(records, key=lambda r: r.wall_time)
+
+    peak_memory = 0
+    if trace_memory:
+        profiler = StageProfiler(trace_memory=True)
+        WORKLOADS[name](profiler)
+        peak_memory = max(r.peak_memory for r in profiler.records
+                          if r.stage == name)
+
+    return {
+        'wall_time': best.wall_time,
+        'cpu_time': best.cpu_time,
+        'peak_memory': peak_memory,
+        'throughput': best.sizes['pixels'] / best.wall_time,
+        'sizes': best.sizes,
+    }
+
+
+def compare(results, baseline, threshold=0.2):
+    '''
+    Return the (workload, quantity, value, baseline value) of every wall
+    time or peak memory that is more than threshold above the baseline,
+    and the workloads that are missing from the baseline or failed in it.
+    Failed results are skipped. Peak memory is not compared if either side
+    was run without it (recorded as 0).
+
+    '''
+    regressions = []
+    missing = []
+    for name, result in results.items():
+        if 'failed' in result:
+            continue
+        if name not in baseline or 'failed' in baseline[name]:
+            missing.append(name)
+            continue
+        for quantity in ['wall_time', 'peak_memory']:
+            value = result[quantity]
+            reference = baseline[name][quantity]
+            if quantity == 'peak_memory' and (value == 0 or reference == 0):
+                continue
+            if value > reference * (1. + threshold):
+                regressions.append((name, quantity, value, reference))
+
+    return regressions, missing
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('workloads',
+                        nargs='*',
+                        help='Workloads to run (default: all): ' +
+                        ', '.join(WORKLOADS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-memory',
+                        action='store_true',
+                        help='Skip the peak memory run')
+    parser.add_argument('--output', help='Write the results to this JSON')
+    parser.add_argument('--save-baseline',
+                        help='Write the results as the new baseline')
+    parser.add_argument('--baseline', help='Compare against this baseline')
+    parser.add_argument('--threshold',
+                        type=float,
+                        default=0.2,
+                        help='Allowed fractional slowdown (default: 0.2)')
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in args.workloads if name not in WORKLOADS]
+    if unknown:
+        parser.error('unknown workload(s): {}'.format(', '.join(unknown)))
+
+    results = run(args.workloads or list(WORKLOADS),
+                  repeat=args.repeat,
+                  trace_memory=not args.no_memory)
+
+    failed = [name for name, result in results.items() if 'failed' in result]
+    for name, result in results.items():
+        if name in failed:
+            continue
+        print('{:<18s} {:10.4f} s {:10.4f} s cpu {:10.1f} MB '
+              '{:12.4g} pix/s'.format(name, result['wall_time'],
+                                      result['cpu_time'],
+                                      result['peak_memory'] / 1024.**2,
+                                      result['throughput']))
+
+    for filename in [args.output, args.save_baseline]:
+        if filename is not None:
+            with open(filename, 'w') as f:
+                json.dump(results, f, indent=2)
+
+    for name in failed:
+        print('FAILED {}: {}'.format(name, results[name]['failed']))
+
+    regressions = []
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions, missing = compare(results, baseline, args.threshold)
+        for name in missing:
+            print('MISSING {}: not in the baseline, not compared'.format(name))
+        for name, quantity, value, reference in regressions:
+            print('REGRESSION {}: {} {:.4g} > baseline {:.4g}'.format(
+                name, quantity, value, reference))
+
+    if failed or regressions:
+        return 1
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
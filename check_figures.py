@@ -0,0 +1,98 @@
+"""
+Checks that the shortcuts taken in the figure scripts reproduce the slow,
+straightforward methods they replace.
+
+    python check_figures.py
+"""
+from astropy.io import fits
+from aspired import spectral_reduction
+from scipy.ndimage import rotate
+import numpy as np
+
+from figure_helpers import (COSMICRAY_BORDER, mask_slices, rectify_spatial,
+                            rectify_spatial_upsample_roll)
+
+FLOYDS = 'ogg2m001-en06-20160111-0005-e00.fits.fz'
+
+
+def check_rectification(upsample_factor=10, rtol=0.05, atol=5.):
+    '''
+    Compare rectify_spatial with the upsample-and-roll rectification on the
+    fig_02 frame. atol is in electrons and covers the sky pixels, where an
+    rtol alone cannot pass.
+
+    '''
+    fits_file = fits.open(FLOYDS)[1]
+    red = spectral_reduction.TwoDSpec(fits_file.data,
+                                      header=fits_file.header,
+                                      spatial_mask=np.arange(0, 330),
+                                      spec_mask=np.arange(0, 1500),
+                                      cosmicray=True,
+                                      sigclip=3.,
+                                      readnoise=3.5,
+                                      gain=2.3,
+                                      log_level='CRITICAL',
+                                      log_file_name=None)
+    red.ap_trace(nspec=1,
+                 ap_faint=10,
+                 trace_width=25,
+                 shift_tol=50,
+                 fit_deg=7,
+                 display=False)
+
+    trace = np.asarray(red.spectrum_list[0].trace)
+    img_fast = rectify_spatial(red.img, trace)
+    img_roll = rectify_spatial_upsample_roll(red.img, trace, upsample_factor)
+
+    # np.roll wraps around and the first column is never shifted, so only
+    # compare the rows and columns that both methods treat the same way
+    margin = int(np.ceil(np.max(np.abs(trace - trace[len(trace) // 2])))) + 1
+    np.testing.assert_allclose(img_fast[margin:-margin, 1:],
+                               img_roll[margin:-margin, 1:],
+                               rtol=rtol,
+                               atol=atol)
+
+
+def check_cosmicray_border(border=COSMICRAY_BORDER):
+    '''
+    Compare cleaning only the masked region plus a border with cleaning
+    the full frame, for the fig_02 and the (rotated) fig_03 setups. The
+    kept pixels have to be identical.
+
+    '''
+    fits_file = fits.open(FLOYDS)[1]
+    kwargs = {
+        'header': fits_file.header,
+        'cosmicray': True,
+        'sigclip': 3.,
+        'readnoise': 3.5,
+        'gain': 2.3,
+        'log_level': 'CRITICAL',
+        'log_file_name': None
+    }
+
+    for data, spatial_mask, spec_mask in [
+        (fits_file.data, np.arange(0, 330), np.arange(0, 1500)),
+        (rotate(fits_file.data, 6), np.arange(180, 420), np.arange(15, 1500))
+    ]:
+        spatial_slice, spec_slice = mask_slices(spatial_mask, spec_mask,
+                                                border)
+
+        img_full = spectral_reduction.TwoDSpec(data,
+                                               spatial_mask=spatial_mask,
+                                               spec_mask=spec_mask,
+                                               **kwargs).img
+        img_cropped = spectral_reduction.TwoDSpec(
+            data[spatial_slice, spec_slice],
+            spatial_mask=spatial_mask - spatial_slice.start,
+            spec_mask=spec_mask - spec_slice.start,
+            **kwargs).img
+
+        np.testing.assert_array_equal(img_cropped, img_full)
+
+
+if __name__ == '__main__':
+    check_rectification()
+    print('check_rectification passed')
+    check_cosmicray_border()
+    print('check_cosmicray_border passed')
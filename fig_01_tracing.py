@@ -2,7 +2,7 @@ from astropy.io import fits
 from matplotlib import pyplot as plt
 from matplotlib.patches import Rectangle
 from scipy.ndimage import rotate
-from scipy.signal import correlate
+from scipy.signal import fftconvolve
 import numpy as np
 
 data = fits.open('v_s_20180810_27_1_0_2.fits.gz')[0].data
@@ -50,13 +50,11 @@ ax1.set_xlabel('Pixel (Dispersion)')
 ax1.set_ylim(139, 181)
 ax1.set_ylabel('Pixel (Spatial)')
 
-line2 = np.sum(data[140:180, 200:300], axis=1)
-line3 = np.sum(data[140:180, 250:350], axis=1)
-line4 = np.sum(data[140:180, 350:400], axis=1)
-
-line2 /= max(line2)
-line3 /= max(line3)
-line4 /= max(line4)
+# Spatial profiles of all the windows as one 2D array
+windows = [(200, 300), (250, 350), (350, 400)]
+profiles = np.array([np.sum(data[140:180, i:j], axis=1) for i, j in windows])
+profiles /= np.max(profiles, axis=1)[:, None]
+line2, line3, line4 = profiles
 
 ax2.plot(range(140, 180), line2, color='orange')
 ax2.plot(range(140, 180), line3, color='green')
@@ -76,8 +74,11 @@ ax2.set_yticks([])
 ax2.set_ylabel(r'Normalised e$^{-}$ count')
 ax2.set_xlabel('Pixel (Spatial)')
 
-cor1 = correlate(line3, line2, mode='same')
-cor2 = correlate(line4, line3, mode='same')
+# Cross-correlate every neighbouring pair of windows in a single FFT
+cor1, cor2 = fftconvolve(profiles[1:],
+                         profiles[:-1, ::-1],
+                         mode='same',
+                         axes=1)
 
 ax3.plot(range(-int(len(line2) / 2), int(len(line2) / 2)),
          cor1,
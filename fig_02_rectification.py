@@ -1,16 +1,22 @@
 from astropy.io import fits
 from aspired import spectral_reduction
 from matplotlib import pyplot as plt
-from scipy import ndimage
 import numpy as np
 
-fits_file = fits.open('ogg2m001-en06-20160111-0005-e00.fits.fz')[1]
-data = fits_file.data
-header = fits_file.header
+from figure_helpers import mask_slices, rectify_spatial
 
 red_spatial_mask = np.arange(0, 330)
 red_spec_mask = np.arange(0, 1500)
 
+fits_file = fits.open('ogg2m001-en06-20160111-0005-e00.fits.fz')[1]
+# Only decompress the tiles that cover the masked region plus a border, so
+# that the cosmic ray cleaning of the kept pixels is not affected by the cut
+spatial_slice, spec_slice = mask_slices(red_spatial_mask, red_spec_mask)
+data = fits_file.section[spatial_slice, spec_slice]
+red_spatial_mask = red_spatial_mask - spatial_slice.start
+red_spec_mask = red_spec_mask - spec_slice.start
+header = fits_file.header
+
 upsample_factor = 10
 
 red = spectral_reduction.TwoDSpec(data,
@@ -33,18 +39,10 @@ red.ap_trace(nspec=1,
 
 red.get_rectification(upsample_factor=upsample_factor)
 
-img_tmp = ndimage.zoom(red.img, zoom=upsample_factor)
-
-y_tmp = ndimage.zoom(np.array(red.spectrum_list[0].trace),
-                     zoom=upsample_factor)
-
-for i in range(1, red.spec_size * upsample_factor):
-    shift_i = int(
-        np.round((y_tmp[i] - y_tmp[len(y_tmp) // 2]) * upsample_factor))
-    img_column_i = img_tmp[:, i]
-    img_tmp[:, i] = np.roll(img_column_i, -shift_i)
-
-img_tmp = ndimage.zoom(img_tmp, zoom=1. / upsample_factor)
+# Shift every column by its sub-pixel trace offset in a single resample,
+# without building an upsampled copy of the image. check_figures.py
+# compares this with the upsample-and-roll method.
+img_tmp = rectify_spatial(red.img, red.spectrum_list[0].trace)
 
 fig = plt.figure(1, figsize=(6, 6))
 fig.clf()
@@ -53,19 +51,19 @@ ax1 = fig.add_subplot(3, 1, 1)
 ax2 = fig.add_subplot(3, 1, 2)
 ax3 = fig.add_subplot(3, 1, 3)
 
-ax1.imshow(np.log10(red.img),
-           vmin=np.nanpercentile(np.log10(red.img), 10),
-           vmax=np.nanpercentile(np.log10(red.img), 99),
-           origin='lower',
-           aspect='auto')
+# Take the log and the display limits of the image only once
+img_logged = np.log10(red.img)
+vmin, vmax = np.nanpercentile(img_logged, [10, 99])
+
+ax1.imshow(img_logged, vmin=vmin, vmax=vmax, origin='lower', aspect='auto')
 ax2.imshow(np.log10(img_tmp),
-           vmin=np.nanpercentile(np.log10(red.img), 10),
-           vmax=np.nanpercentile(np.log10(red.img), 99),
+           vmin=vmin,
+           vmax=vmax,
            origin='lower',
            aspect='auto')
 ax3.imshow(np.log10(red.img_rectified),
-           vmin=np.nanpercentile(np.log10(red.img), 10),
-           vmax=np.nanpercentile(np.log10(red.img), 99),
+           vmin=vmin,
+           vmax=vmax,
            origin='lower',
            aspect='auto')
 
@@ -6,6 +6,8 @@ import numpy as np
 from scipy.ndimage import rotate
 from statsmodels.nonparametric.smoothers_lowess import lowess
 
+from figure_helpers import mask_slices
+
 fits_file = fits.open('ogg2m001-en06-20160111-0005-e00.fits.fz')[1]
 data = fits_file.data
 header = fits_file.header
@@ -14,6 +16,13 @@ data = rotate(data, 6)
 red_spatial_mask = np.arange(180, 420)
 red_spec_mask = np.arange(15, 1500)
 
+# Only pass the masked region plus a border to TwoDSpec, so that the cosmic
+# ray cleaning of the kept pixels is not affected by the cut
+spatial_slice, spec_slice = mask_slices(red_spatial_mask, red_spec_mask)
+data = data[spatial_slice, spec_slice]
+red_spatial_mask = red_spatial_mask - spatial_slice.start
+red_spec_mask = red_spec_mask - spec_slice.start
+
 twodspec = spectral_reduction.TwoDSpec(data,
                                        header=header,
                                        spatial_mask=red_spatial_mask,
@@ -34,7 +43,7 @@ twodspec.ap_trace(nspec=1,
                   fit_deg=7,
                   display=True)
 
-trace = np.array(twodspec.spectrum_list[0].trace)
+trace = np.asarray(twodspec.spectrum_list[0].trace)
 
 # trace is at (spatial) pix 70 for (dispersion) pix 600
 extraction_slice = Polygon(
@@ -81,11 +90,15 @@ ax1 = fig.add_subplot(2, 1, 1)
 ax2 = fig.add_subplot(2, 2, 3)
 ax3 = fig.add_subplot(2, 2, 4)
 
-ax1.imshow(np.log10(twodspec.img),
+# Take the log and the display limits of the image only once
+img_logged = np.log10(twodspec.img)
+img_vmin, img_vmax = np.nanpercentile(img_logged, [10, 97])
+
+ax1.imshow(img_logged,
            origin='lower',
            aspect='auto',
-           vmin=np.nanpercentile(np.log10(twodspec.img), 10),
-           vmax=np.nanpercentile(np.log10(twodspec.img), 97),
+           vmin=img_vmin,
+           vmax=img_vmax,
            cmap='gray_r')
 
 # Extraction slice
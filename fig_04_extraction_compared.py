@@ -2,7 +2,6 @@ from aspired import spectral_reduction
 from astropy.io import fits
 from matplotlib import pyplot as plt
 from matplotlib.gridspec import GridSpec
-import copy
 import numpy as np
 
 data = fits.open('v_e_20180906_22_5_0_2.fits.gz')[0].data
@@ -14,11 +13,14 @@ twodspec = spectral_reduction.TwoDSpec(data,
 
 twodspec.ap_trace(nspec=2, nwindow=10, display=False)
 
+# Each extraction overwrites the previous one, so keep a copy of the
+# results. The residual images are only displayed, so float32 is enough.
+
 # Tophat
 twodspec.ap_extract(spec_id=0, apwidth=10, skywidth=5, skysep=0, skydeg=1, optimal=False)
-count_tophat = copy.deepcopy(twodspec.spectrum_list[0].count)
-count_tophat_err = copy.deepcopy(twodspec.spectrum_list[0].count_err)
-img_residual_tophat = copy.deepcopy(twodspec.img_residual)
+count_tophat = np.array(twodspec.spectrum_list[0].count)
+count_tophat_err = np.array(twodspec.spectrum_list[0].count_err)
+img_residual_tophat = np.array(twodspec.img_residual, dtype=np.float32)
 
 # Horne86
 twodspec.ap_extract(spec_id=0,
@@ -28,9 +30,9 @@ twodspec.ap_extract(spec_id=0,
                     skydeg=1,
                     optimal=True,
                     algorithm='horne86')
-count_horne86 = copy.deepcopy(twodspec.spectrum_list[0].count)
-count_horne86_err = copy.deepcopy(twodspec.spectrum_list[0].count_err)
-img_residual_horne86 = copy.deepcopy(twodspec.img_residual)
+count_horne86 = np.array(twodspec.spectrum_list[0].count)
+count_horne86_err = np.array(twodspec.spectrum_list[0].count_err)
+img_residual_horne86 = np.array(twodspec.img_residual, dtype=np.float32)
 
 # Marsh89
 twodspec.ap_extract(spec_id=0, 
@@ -43,9 +45,9 @@ twodspec.ap_extract(spec_id=0,
                     pord=4,
                     nreject=0,
                     qmode='fast-linear')
-count_marsh89 = copy.deepcopy(twodspec.spectrum_list[0].count)
-count_marsh89_err = copy.deepcopy(twodspec.spectrum_list[0].count_err)
-img_residual_marsh89 = copy.deepcopy(twodspec.img_residual)
+count_marsh89 = np.array(twodspec.spectrum_list[0].count)
+count_marsh89_err = np.array(twodspec.spectrum_list[0].count_err)
+img_residual_marsh89 = np.array(twodspec.img_residual, dtype=np.float32)
 
 fig = plt.figure(1, figsize=(6, 6))
 fig.clf()
@@ -60,7 +62,7 @@ data_logged = np.log10(data)
 data_logged[np.isnan(data_logged)] = np.nanmin(data_logged)
 
 ax1.imshow(data_logged, origin='lower', aspect='auto', vmax=1.75)
-ax1.plot(np.array(twodspec.spectrum_list[0].trace) - 0.5,
+ax1.plot(np.asarray(twodspec.spectrum_list[0].trace) - 0.5,
          lw=1,
          ls=':',
          color='black')
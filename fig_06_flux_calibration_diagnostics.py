@@ -1,7 +1,6 @@
 from aspired import spectral_reduction
 from astropy.io import fits
 from matplotlib import pyplot as plt
-import copy
 import numpy as np
 
 atlas = [
@@ -38,7 +37,6 @@ standard_twodspec.ap_extract(apwidth=10,
                              skydeg=1,
                              optimal=True,
                              algorithm='horne86')
-standard_count = copy.deepcopy(standard_twodspec.spectrum_list[0].count)
 
 # Science
 science_twodspec.add_arc(arc)
@@ -49,7 +47,6 @@ science_twodspec.ap_extract(apwidth=10,
                             skydeg=1,
                             optimal=True,
                             algorithm='horne86')
-science_count = copy.deepcopy(science_twodspec.spectrum_list[0].count)
 
 onedspec = spectral_reduction.OneDSpec()
 onedspec.from_twodspec(science_twodspec, stype='science')
@@ -84,15 +81,15 @@ onedspec.load_standard('hilt102')
 onedspec.get_sensitivity()
 onedspec.apply_flux_calibration()
 
-sensitivity = np.array(onedspec.science_spectrum_list[0].sensitivity)
-wave = np.array(onedspec.standard_spectrum_list[0].wave)
-count = np.array(onedspec.standard_spectrum_list[0].count)
+sensitivity = np.asarray(onedspec.science_spectrum_list[0].sensitivity)
+wave = np.asarray(onedspec.standard_spectrum_list[0].wave)
+count = np.asarray(onedspec.standard_spectrum_list[0].count)
 
-wave_standard = np.array(onedspec.standard_spectrum_list[0].wave_resampled)
-flux_standard = np.array(onedspec.standard_spectrum_list[0].flux_resampled)
+wave_standard = np.asarray(onedspec.standard_spectrum_list[0].wave_resampled)
+flux_standard = np.asarray(onedspec.standard_spectrum_list[0].flux_resampled)
 
-wave_literature = np.array(onedspec.standard_spectrum_list[0].wave_literature)
-flux_literature = np.array(onedspec.standard_spectrum_list[0].flux_literature)
+wave_literature = np.asarray(onedspec.standard_spectrum_list[0].wave_literature)
+flux_literature = np.asarray(onedspec.standard_spectrum_list[0].flux_literature)
 
 mask = wave > 4000.
 
@@ -0,0 +1,72 @@
+"""
+Helpers shared by the figure scripts and check_figures.py.
+"""
+from scipy import ndimage
+import numpy as np
+
+# Border kept around the masked region when a frame is cropped before
+# TwoDSpec cleans its cosmic rays. This is an empirical margin, not a
+# derived one: a single astroscrappy pass in the convolve mode used by
+# TwoDSpec (7x7 PSF convolution, sepmedfilt7/9) already reaches about 14 px,
+# and the background level is a median over the whole input array, so no
+# finite border can guarantee identical output. check_figures.py checks it
+# with check_cosmicray_border; on the fig_02 and fig_03 frames the kept
+# pixels are identical to full-frame cleaning from 8 px upwards.
+COSMICRAY_BORDER = 32
+
+
+def rectify_spatial(img, trace, order=3):
+    '''
+    Shift every column of img by the sub-pixel offset of the trace from its
+    value at the middle column, in a single spline resample. No upsampled
+    copy of the image is made.
+
+    Parameters
+    ----------
+    img: 2D numpy array
+        Image with the dispersion along the second axis.
+    trace: 1D array
+        Spatial position of the trace at each column.
+    order: int
+        Order of the spline interpolation.
+
+    '''
+    trace = np.asarray(trace)
+    shift = trace - trace[len(trace) // 2]
+    y_idx, x_idx = np.indices(np.shape(img), dtype=float)
+    return ndimage.map_coordinates(img, [y_idx + shift, x_idx],
+                                   order=order,
+                                   mode='nearest')
+
+
+def rectify_spatial_upsample_roll(img, trace, upsample_factor):
+    '''
+    Reference implementation of the spatial rectification: upsample the
+    image, roll each upsampled column by the integer shift of the trace
+    and downsample again. Slow, kept for checking rectify_spatial.
+
+    '''
+    img_tmp = ndimage.zoom(img, zoom=upsample_factor)
+    y_tmp = ndimage.zoom(np.asarray(trace), zoom=upsample_factor)
+
+    for i in range(1, np.shape(img)[1] * upsample_factor):
+        shift_i = int(
+            np.round((y_tmp[i] - y_tmp[len(y_tmp) // 2]) * upsample_factor))
+        img_tmp[:, i] = np.roll(img_tmp[:, i], -shift_i)
+
+    return ndimage.zoom(img_tmp, zoom=1. / upsample_factor)
+
+
+def mask_slices(spatial_mask, spec_mask, border=COSMICRAY_BORDER):
+    '''
+    Slices covering the masked region plus a border, so that cropping a
+    frame before cosmic ray cleaning leaves the kept pixels as they would be
+    after cleaning the full frame. The masks have to be shifted by the
+    start of the slices to index the cropped frame.
+
+    '''
+    spatial_slice = slice(max(spatial_mask[0] - border, 0),
+                          spatial_mask[-1] + border + 1)
+    spec_slice = slice(max(spec_mask[0] - border, 0),
+                       spec_mask[-1] + border + 1)
+    return spatial_slice, spec_slice
@@ -0,0 +1,239 @@
+"""
+Opt-in per-stage timing and memory records for the reduction scripts.
+
+    profiler = StageProfiler()
+    profiler.attach(twodspec)
+    profiler.attach(onedspec)
+    ...
+    profiler.to_json('stages.json')
+    profiler.to_csv('stages.csv')
+
+attach() wraps the reduction stages of a TwoDSpec or OneDSpec instance
+(the class itself is left untouched). Each call adds a StageRecord with
+the wall time, the CPU time, the peak memory allocated during the call
+and the sizes that drive its cost. find_arc_lines also records arc_peaks,
+the number of peaks found in the spectra selected by stype and spec_id.
+RASCAL does not expose how many RANSAC samples fit() actually draws, so fit
+only records its max_tries limit.
+
+A profiler is not thread-safe: nested stages are tracked on a single
+stack and the tracemalloc peak is process wide, so only use it from one
+thread.
+"""
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+import csv
+import functools
+import inspect
+import json
+import numbers
+import time
+import tracemalloc
+
+STAGES = ('ap_trace', 'get_rectification', 'ap_extract', 'extract_arc_spec',
+          'find_arc_lines', 'do_hough_transform', 'fit', 'get_sensitivity',
+          'apply_flux_calibration')
+
+# Arguments recorded as the sizes of a stage
+SIZE_ARGUMENTS = ('nspec', 'spec_id', 'nwindow', 'resample_factor',
+                  'upsample_factor', 'algorithm', 'fit_deg', 'max_tries',
+                  'stype')
+
+
+def _selected_spectra(obj, arguments):
+    # Only the spectra the call worked on: spec_id selects among the science
+    # spectra, the standard is always a single spectrum
+    stype = arguments.get('stype') or 'science+standard'
+    spec_id = arguments.get('spec_id')
+    if isinstance(spec_id, numbers.Integral):
+        spec_id = [spec_id]
+    if spec_id is not None:
+        spec_id = {int(i) for i in spec_id}
+
+    for name in stype.split('+'):
+        spectra = getattr(obj, name + '_spectrum_list', None) or {}
+        if isinstance(spectra, dict):
+            spectra = spectra.items()
+        else:
+            spectra = enumerate(spectra)
+        for i, spectrum in spectra:
+            if name == 'science' and spec_id is not None and i not in spec_id:
+                continue
+            yield spectrum
+
+
+def _count_arc_peaks(obj, arguments):
+    return sum(
+        len(spectrum.peaks)
+        for spectrum in _selected_spectra(obj, arguments)
+        if getattr(spectrum, 'peaks', None) is not None)
+
+
+# Sizes that are only known once a stage has run, read from the object
+RESULT_SIZES = {
+    'find_arc_lines': ('arc_peaks', _count_arc_peaks),
+}
+
+
+@dataclass
+class StageRecord:
+    stage: str
+    wall_time: float
+    cpu_time: float
+    peak_memory: int
+    sizes: dict = field(default_factory=dict)
+
+
+class StageProfiler:
+
+    def __init__(self, trace_memory=True):
+        '''
+        Parameters
+        ----------
+        trace_memory: bool
+            Track the peak memory with tracemalloc. This slows down
+            allocation heavy code, so it should be turned off when the
+            timing matters (peak_memory is then recorded as 0). If
+            tracemalloc was already started by the caller, its peak is
+            left alone and peak_memory is only an upper bound.
+
+        '''
+        self.trace_memory = trace_memory
+        self.records = []
+        self._peaks = []
+        self._owns_tracing = False
+
+    @contextmanager
+    def stage(self, name, **sizes):
+        '''
+        Record a stage around a block of code. The yielded dictionary can
+        be filled with sizes that are only known at the end of the stage,
+        e.g. the number of arc peaks found.
+
+        '''
+        if self.trace_memory:
+            if not self._peaks:
+                self._owns_tracing = not tracemalloc.is_tracing()
+                if self._owns_tracing:
+                    tracemalloc.start()
+
+            # Only reset the peak of a trace started here. The peak of the
+            # enclosing stage is kept on the stack before it is reset.
+            if self._owns_tracing:
+                if self._peaks:
+                    self._peaks[-1] = max(self._peaks[-1],
+                                          tracemalloc.get_traced_memory()[1])
+                tracemalloc.reset_peak()
+
+            memory_start = tracemalloc.get_traced_memory()[0]
+            self._peaks.append(0)
+
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+
+        try:
+            yield sizes
+
+        finally:
+            wall_time = time.perf_counter() - wall_start
+            cpu_time = time.process_time() - cpu_start
+
+            peak_memory = 0
+            if self.trace_memory:
+                peak = max(self._peaks.pop(),
+                           tracemalloc.get_traced_memory()[1])
+                if self._peaks:
+                    self._peaks[-1] = max(self._peaks[-1], peak)
+                peak_memory = max(peak - memory_start, 0)
+
+                if not self._peaks and self._owns_tracing:
+                    tracemalloc.stop()
+
+            self.records.append(
+                StageRecord(name, wall_time, cpu_time, peak_memory, sizes))
+
+    def attach(self, obj, stages=STAGES):
+        '''
+        Wrap the given stages of a TwoDSpec or OneDSpec instance so that
+        every call is recorded. Stages the object does not have are
+        skipped.
+
+        '''
+        for name in stages:
+            method = getattr(obj, name, None)
+            if callable(method):
+                setattr(obj, name, self._wrap(obj, name, method))
+
+        return obj
+
+    def _wrap(self, obj, name, method):
+
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            try:
+                bound = signature.bind_partial(*args, **kwargs)
+            except TypeError:
+                arguments = call_arguments = kwargs
+            else:
+                arguments = dict(bound.arguments)
+                bound.apply_defaults()
+                call_arguments = bound.arguments
+            sizes = {
+                key: arguments[key]
+                for key in SIZE_ARGUMENTS if key in arguments
+            }
+            img = getattr(obj, 'img', None)
+            if img is not None:
+                sizes['image_shape'] = tuple(getattr(img, 'shape', ()))
+
+            with self.stage(name, **sizes) as stage_sizes:
+                result = method(*args, **kwargs)
+                if name in RESULT_SIZES:
+                    key, count = RESULT_SIZES[name]
+                    stage_sizes[key] = count(obj, call_arguments)
+
+            return result
+
+        return wrapper
+
+    def to_dict(self):
+        return [asdict(record) for record in self.records]
+
+    def to_json(self, filename=None):
+        '''
+        Return the records as a JSON string, and also write them to
+        filename if given.
+
+        '''
+        output = json.dumps(self.to_dict(), indent=2, default=str)
+
+        if filename is not None:
+            with open(filename, 'w') as f:
+                f.write(output)
+
+        return output
+
+    def to_csv(self, filename):
+        '''
+        Write one row per record, with one column per size keyword that
+        appears in any of the records.
+
+        '''
+        size_keys = []
+        for record in self.records:
+            for key in record.sizes:
+                if key not in size_keys:
+                    size_keys.append(key)
+
+        fieldnames = ['stage', 'wall_time', 'cpu_time', 'peak_memory'
+                      ] + size_keys
+
+        with open(filename, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            for record in self.records:
+                row = asdict(record)
+                row.update(row.pop('sizes'))
+                writer.writerow(row)
@@ -0,0 +1,38 @@
+import pytest
+
+pytest.importorskip('aspired')
+
+from benchmark import compare
+
+
+def result(wall_time, peak_memory):
+    return {'wall_time': wall_time, 'peak_memory': peak_memory}
+
+
+def test_compare_threshold():
+    baseline = {'a': result(1., 100), 'b': result(1., 100)}
+    results = {'a': result(1.19, 119), 'b': result(1.21, 121)}
+
+    regressions, missing = compare(results, baseline, threshold=0.2)
+
+    assert regressions == [('b', 'wall_time', 1.21, 1.),
+                           ('b', 'peak_memory', 121, 100)]
+    assert missing == []
+
+
+def test_compare_skips_memory_run_without_tracing():
+    baseline = {'a': result(1., 0), 'b': result(1., 100)}
+    results = {'a': result(1., 500), 'b': result(1., 0)}
+
+    assert compare(results, baseline) == ([], [])
+
+
+def test_compare_missing_and_failed_workloads():
+    baseline = {'a': result(1., 100), 'c': {'failed': 'ValueError: c'}}
+    results = {
+        'a': {'failed': 'ValueError: a'},
+        'b': result(5., 100),
+        'c': result(5., 100)
+    }
+
+    assert compare(results, baseline) == ([], ['b', 'c'])
@@ -0,0 +1,127 @@
+import tracemalloc
+
+from profiling import StageProfiler
+
+MB = 1024**2
+
+
+class Spectrum:
+
+    def __init__(self):
+        self.peaks = None
+
+
+class FakeOneDSpec:
+
+    def __init__(self):
+        self.science_spectrum_list = {0: Spectrum(), 1: Spectrum()}
+        self.standard_spectrum_list = {0: Spectrum()}
+
+    def find_arc_lines(self,
+                       prominence=5.,
+                       spec_id=None,
+                       stype='science+standard'):
+        stype_split = stype.split('+')
+        if 'science' in stype_split:
+            for i in [0, 1] if spec_id is None else [spec_id]:
+                self.science_spectrum_list[i].peaks = [10., 20., 30.]
+        if 'standard' in stype_split:
+            self.standard_spectrum_list[0].peaks = [15., 25.]
+
+    def fit(self, max_tries=5000, fit_deg=4, stype='science+standard'):
+        pass
+
+
+def test_nested_peak_reaches_the_enclosing_stage():
+    profiler = StageProfiler()
+    with profiler.stage('outer'):
+        with profiler.stage('inner'):
+            block = bytearray(8 * MB)
+            del block
+        block = bytearray(2 * MB)
+        del block
+
+    inner, outer = profiler.records
+    assert inner.stage == 'inner'
+    assert 8 * MB <= inner.peak_memory < 9 * MB
+    # The inner peak is larger than anything allocated after it
+    assert 8 * MB <= outer.peak_memory < 9 * MB
+    assert not tracemalloc.is_tracing()
+
+
+def test_peak_before_the_nested_stage_is_kept():
+    profiler = StageProfiler()
+    with profiler.stage('outer'):
+        block = bytearray(8 * MB)
+        del block
+        with profiler.stage('inner'):
+            block = bytearray(2 * MB)
+            del block
+
+    inner, outer = profiler.records
+    assert 2 * MB <= inner.peak_memory < 3 * MB
+    assert 8 * MB <= outer.peak_memory < 9 * MB
+
+
+def test_caller_peak_is_not_reset():
+    tracemalloc.start()
+    try:
+        block = bytearray(8 * MB)
+        del block
+        profiler = StageProfiler()
+        with profiler.stage('stage'):
+            pass
+        assert tracemalloc.is_tracing()
+        assert tracemalloc.get_traced_memory()[1] >= 8 * MB
+    finally:
+        tracemalloc.stop()
+
+
+def test_no_memory_tracing():
+    profiler = StageProfiler(trace_memory=False)
+    with profiler.stage('stage'):
+        block = bytearray(8 * MB)
+        del block
+
+    assert profiler.records[0].peak_memory == 0
+    assert not tracemalloc.is_tracing()
+
+
+def test_attach_records_positional_arguments():
+    profiler = StageProfiler(trace_memory=False)
+    onedspec = profiler.attach(FakeOneDSpec())
+    onedspec.fit(200, 5)
+
+    assert profiler.records[0].sizes == {'max_tries': 200, 'fit_deg': 5}
+
+
+def test_arc_peaks_only_count_the_selected_spectra():
+    profiler = StageProfiler(trace_memory=False)
+    onedspec = profiler.attach(FakeOneDSpec())
+    onedspec.find_arc_lines(2, stype='standard')
+    onedspec.find_arc_lines(2, stype='science')
+    onedspec.find_arc_lines(2, stype='science')
+    onedspec.find_arc_lines(2, spec_id=1, stype='science')
+    onedspec.find_arc_lines(2)
+
+    arc_peaks = [record.sizes['arc_peaks'] for record in profiler.records]
+    assert arc_peaks == [2, 6, 6, 3, 8]
+    assert profiler.records[0].sizes == {
+        'stype': 'standard',
+        'arc_peaks': 2
+    }
+
+
+def test_export(tmp_path):
+    profiler = StageProfiler(trace_memory=False)
+    with profiler.stage('a', nwindow=10):
+        pass
+    with profiler.stage('b') as sizes:
+        sizes['arc_peaks'] = 3
+
+    assert '"arc_peaks": 3' in profiler.to_json(tmp_path / 'stages.json')
+    profiler.to_csv(tmp_path / 'stages.csv')
+    lines = (tmp_path / 'stages.csv').read_text().splitlines()
+    assert lines[0] == 'stage,wall_time,cpu_time,peak_memory,nwindow,arc_peaks'
+    assert lines[1].startswith('a,') and lines[1].endswith(',10,')
+    assert lines[2].endswith(',,3')